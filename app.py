@@ -1,27 +1,30 @@
 from __future__ import annotations
 
 import os
+import re
 import sys
 import asyncio
+import collections
 import logging
 import contextlib
+import functools
 import threading
 import time
-from typing import Dict, Optional, Tuple, Deque, Any, List
-from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple, Any, List, Set, Union, TextIO
 from pathlib import Path
 from datetime import datetime, timezone
 import concurrent.futures
 
-from asset_commands import setup_asset_commands, add_stats_command
+from asset_commands import AssetCommands, setup_asset_commands, add_stats_command
+from whisper_worker import WhisperProcess
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 import discord
 from discord import app_commands
 from discord.abc import Messageable
 from discord.ext import voice_recv  # pip install -U discord-ext-voice-recv
-from faster_whisper import WhisperModel
 
 # ------------ logging ------------
 logger = logging.getLogger("freshbot")
@@ -38,16 +41,26 @@ if not TOKEN:
 
 LANG = os.getenv("LANGUAGE", "en").strip() or "en"
 
-WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL", "small").strip() or "small"
-
 SR_IN = 48000
 SR_OUT = 16000
-CHUNK_SECONDS = 5
+CHUNK_SECONDS = 8
 IDLE_FLUSH_SECONDS = 2.0
-MAX_BUFFER_SECONDS = 6.0
+# a pause this long after at least MIN_SPEECH_SECONDS of audio ends the utterance
+SPEECH_END_SECONDS = 0.4
+MIN_SPEECH_SECONDS = 1.0
+MAX_BUFFER_SECONDS = 9.0
 MIN_SECONDS_TO_POST = 1.6
+# clips (and, after a short hangover, packets) quieter than this RMS in int16 units are
+# dropped before they reach Whisper
+RMS_GATE = float(os.getenv("RMS_GATE", "250") or 0) / 32768.0
+# quiet 20 ms packets still buffered after speech before the rest are dropped (200 ms)
+QUIET_PACKETS_KEPT = 10
 TRANSCRIPTS_DIR = Path(os.getenv("TRANSCRIPTS_DIR", "transcripts"))
 TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
+DECIMATION = SR_IN // SR_OUT
+DISCORD_MESSAGE_LIMIT = 2000
+POST_COALESCE_SECONDS = 0.75
+OPUS_SILENCE = b"\xf8\xff\xfe"  # the 3-byte frame Discord sends for silence
 
 intents = discord.Intents.default()
 intents.guilds = True
@@ -58,62 +71,121 @@ intents.message_content = False
 client = discord.Client(intents=intents)
 tree = app_commands.CommandTree(client)
 
-logger.info(f"Loading Whisper model: {WHISPER_MODEL_SIZE}")
-_model = WhisperModel(WHISPER_MODEL_SIZE, device="cpu", compute_type="int8")
+# Whisper (model config: WHISPER_MODEL / WHISPER_DEVICE / WHISPER_COMPUTE) runs in a
+# separate process; see whisper_worker.py
+logger.info("Starting Whisper worker process...")
+_whisper = WhisperProcess()
+_whisper.start()
+# Whisper gets its own pool so transcription never queues behind (or starves) the default executor;
+# one thread is enough since TranscribeQueue issues a single request at a time
+_WHISPER_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper")
+BATCH_MAX = 8  # clips per Whisper request across all sessions
+MAX_PENDING_REQUESTS = 4  # queued flushes waiting on Whisper before the oldest is dropped
+PROMPT_WORDS = 40  # trailing words per speaker passed to Whisper as initial_prompt
+
+_UNSAFE_NAME_CHARS = re.compile(r"[^\w\-. ]+")
 
 class TranscriptLogger:
+    # lines are buffered and flushed at most once per FLUSH_INTERVAL (and on stop); a
+    # timer flushes the tail of a burst so no line waits longer than that
+    FLUSH_INTERVAL = 1.0
+
     def __init__(self, root: Path = TRANSCRIPTS_DIR) -> None:
         self.root = root
-        self._open_files: Dict[int, Path] = {}
+        self._open_files: Dict[int, TextIO] = {}
+        self._last_flush: Dict[int, float] = {}
+        self._flush_timers: Dict[int, asyncio.TimerHandle] = {}
 
     @staticmethod
+    @functools.lru_cache(maxsize=256)
     def _safe(name: str) -> str:
-        return "".join(c for c in name if c.isalnum() or c in (" ", "_", "-", ".")).strip().replace(" ", "_")
+        return _UNSAFE_NAME_CHARS.sub("", name).strip().replace(" ", "_")
 
     def start_session(self, guild: Optional[discord.Guild], channel: Optional[discord.abc.GuildChannel]) -> Path:
-        date = datetime.now(timezone.utc).strftime("%Y%m%d")
+        now = datetime.now(timezone.utc)
         gname = self._safe(guild.name) if guild and guild.name else f"guild_{getattr(guild, 'id', 'unknown')}"
         cname = self._safe(channel.name) if channel and hasattr(channel, "name") else f"chan_{getattr(channel,'id','unknown')}"
-        stamp = datetime.now(timezone.utc).strftime("%H%M%S")
-        path = self.root / f"{date}_{gname}_{cname}_{stamp}.txt"
+        path = self.root / f"{now:%Y%m%d}_{gname}_{cname}_{now:%H%M%S}.txt"
         header = (
             f"# FreshBot Transcript\n"
             f"# Guild: {guild.name if guild else 'Unknown'} (id={getattr(guild,'id','?')})\n"
             f"# Channel: {getattr(channel,'name','Unknown')} (id={getattr(channel,'id','?')})\n"
-            f"# UTC Start: {datetime.now(timezone.utc).isoformat()}\n"
+            f"# UTC Start: {now.isoformat()}\n"
             f"# ------------------------------------------------------------\n"
         )
         path.write_text(header, encoding="utf-8")
         if guild and guild.id is not None:
-            self._open_files[guild.id] = path
+            self._close(guild.id)
+            self._open(guild.id, path)
         return path
 
+    def _open(self, guild_id: int, path: Path) -> TextIO:
+        f = open(path, "a", encoding="utf-8", buffering=8192)
+        self._open_files[guild_id] = f
+        self._last_flush[guild_id] = time.monotonic()
+        return f
+
+    def _close(self, guild_id: int) -> Optional[Path]:
+        f = self._open_files.pop(guild_id, None)
+        self._last_flush.pop(guild_id, None)
+        timer = self._flush_timers.pop(guild_id, None)
+        if timer is not None:
+            timer.cancel()
+        if f is None:
+            return None
+        with contextlib.suppress(Exception):
+            f.close()
+        return Path(f.name)
+
     def append_line(self, guild_id: int, text: str, speaker: Optional[str] = None, ts: Optional[float] = None, fallback_path: Optional[Path] = None) -> None:
-        path = self._open_files.get(guild_id)
-        if not path and fallback_path and fallback_path.exists():
-            self._open_files[guild_id] = fallback_path
-            path = fallback_path
-        if not path:
+        f = self._open_files.get(guild_id)
+        if f is None and fallback_path and fallback_path.exists():
+            f = self._open(guild_id, fallback_path)
+        if f is None:
             return
-        if ts is not None:
-            tstr = datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%H:%M:%S")
-        else:
-            tstr = datetime.now(timezone.utc).strftime("%H:%M:%S")
+        # UTC wall-clock seconds of the day; plain integer math instead of strftime
+        secs = int(time.time() if ts is None else ts) % 86400
+        tstr = f"{secs // 3600:02d}:{secs // 60 % 60:02d}:{secs % 60:02d}"
         who = f"{speaker}: " if speaker else ""
         line = f"[{tstr}] {who}{text}\n"
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(line)
+        f.write(line)
+        wait = self.FLUSH_INTERVAL - (time.monotonic() - self._last_flush.get(guild_id, 0.0))
+        if wait <= 0:
+            self._flush(guild_id)
+        elif guild_id not in self._flush_timers:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._flush(guild_id)  # no loop to come back on
+            else:
+                self._flush_timers[guild_id] = loop.call_later(wait, self._flush, guild_id)
+
+    def _flush(self, guild_id: int) -> None:
+        timer = self._flush_timers.pop(guild_id, None)
+        if timer is not None:
+            timer.cancel()
+        f = self._open_files.get(guild_id)
+        if f is None:
+            return
+        with contextlib.suppress(Exception):
+            f.flush()
+        self._last_flush[guild_id] = time.monotonic()
 
     def stop_session(self, guild_id: int) -> Optional[Path]:
-        path = self._open_files.pop(guild_id, None)
-        if not path:
+        f = self._open_files.get(guild_id)
+        if f is None:
             return None
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(f"# UTC End: {datetime.now(timezone.utc).isoformat()}\n")
-        return path
+        f.write(f"# UTC End: {datetime.now(timezone.utc).isoformat()}\n")
+        return self._close(guild_id)
+
+    def close_all(self) -> None:
+        for guild_id in list(self._open_files):
+            self._close(guild_id)
 
 transcripts = TranscriptLogger()
 
+_POST_CHANNEL_CACHE: Dict[int, int] = {}  # guild id -> fallback text channel id
+
 def _choose_post_channel(interaction: discord.Interaction) -> Optional[Messageable]:
     ch = interaction.channel
     if isinstance(ch, (discord.TextChannel, discord.Thread, discord.DMChannel)):
@@ -121,14 +193,20 @@ def _choose_post_channel(interaction: discord.Interaction) -> Optional[Messageab
     g = interaction.guild
     if g is None:
         return None
-    sys_ch = g.system_channel
-    if isinstance(sys_ch, discord.TextChannel):
-        me = g.me
-        if me and sys_ch.permissions_for(me).send_messages:
-            return sys_ch
     me = g.me
+    if me is None:
+        return None
+    # re-check only the channel picked last time; the full scan runs on a miss
+    cached = g.get_channel(_POST_CHANNEL_CACHE.get(g.id, 0))
+    if isinstance(cached, discord.TextChannel) and cached.permissions_for(me).send_messages:
+        return cached
+    sys_ch = g.system_channel
+    if isinstance(sys_ch, discord.TextChannel) and sys_ch.permissions_for(me).send_messages:
+        _POST_CHANNEL_CACHE[g.id] = sys_ch.id
+        return sys_ch
     for tc in g.text_channels:
-        if me and tc.permissions_for(me).send_messages:
+        if tc.permissions_for(me).send_messages:
+            _POST_CHANNEL_CACHE[g.id] = tc.id
             return tc
     return None
 
@@ -139,204 +217,495 @@ def _display_name(entity: Any) -> str:
         return getattr(entity, "name")
     return f"user_{getattr(entity, 'id', 'unknown')}"
 
-def _downmix_stereo_to_mono_int16(stereo: np.ndarray) -> np.ndarray:
-    if stereo.ndim == 1:
-        return stereo
-    if stereo.shape[-1] == 2:
-        return ((stereo.astype(np.int32).sum(axis=1) // 2)).astype(np.int16)
-    return stereo[..., 0].astype(np.int16)
-
-def _resample_48k_to_16k_mono_int16(mono_48k: np.ndarray) -> np.ndarray:
-    return mono_48k[::3].copy()
-
-def _pcm_bytes_to_int16_array(pcm: bytes) -> np.ndarray:
-    return np.frombuffer(pcm, dtype=np.int16)
-
-def _do_transcribe(model: WhisperModel, audio_f32: np.ndarray, lang: str) -> str:
-    segments, _ = model.transcribe(
-        audio_f32,
-        language=lang,
-        vad_filter=True,
-        beam_size=1,
-        vad_parameters=dict(min_silence_duration_ms=250),
-        condition_on_previous_text=False,
-    )
-    out: List[str] = []
-    for seg in segments:
-        t = (seg.text or "").strip()
-        if t:
-            out.append(t)
-    return " ".join(out).strip()
-
-def _get_with_timeout(fut: concurrent.futures.Future, timeout: float):
-    return fut.result(timeout=timeout)
+def _rms(audio_f32: np.ndarray) -> float:
+    if audio_f32.size == 0:
+        return 0.0
+    return float(np.sqrt(np.dot(audio_f32, audio_f32) / audio_f32.size))
+
+def _pack_messages(lines: List[str], limit: int = DISCORD_MESSAGE_LIMIT) -> List[str]:
+    # join lines with newlines into as few messages as fit Discord's length cap
+    messages: List[str] = []
+    current = ""
+    for line in lines:
+        while len(line) > limit:
+            if current:
+                messages.append(current)
+                current = ""
+            messages.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + 1 + len(line) > limit:
+            messages.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        messages.append(current)
+    return messages
+
+def _design_lowpass(num_taps: int, cutoff: float, beta: float = 5.0) -> np.ndarray:
+    # Kaiser-windowed sinc; cutoff is a fraction of the input Nyquist rate
+    n = np.arange(num_taps) - (num_taps - 1) / 2.0
+    h = cutoff * np.sinc(cutoff * n) * np.kaiser(num_taps, beta)
+    return (h / h.sum()).astype(np.float32)
+
+# anti-alias filter for the 48k -> 16k decimation (cutoff at the new 8 kHz Nyquist)
+RESAMPLE_TAPS = _design_lowpass(96, 1.0 / DECIMATION)
+RESAMPLE_HISTORY = len(RESAMPLE_TAPS) - 1
+# the stereo average (1/2) and int16 -> [-1, 1) scaling are folded into the taps,
+# so a single dot product per output sample yields Whisper-ready float32
+_INGEST_TAPS = (RESAMPLE_TAPS[::-1] * (0.5 / 32768.0)).astype(np.float32)
+
+class ResampleState:
+    """
+    Per-speaker ingest buffers, specialized for one packet size.
+    `window` holds the previous RESAMPLE_HISTORY mono samples followed by the current packet;
+    `frames` is a fixed strided view of it with one row per output sample (every
+    DECIMATION-th 96-tap window), built once so each packet is just an add and a matmul.
+    """
+    def __init__(self, frame_samples: int) -> None:
+        self.resize(frame_samples, history=np.zeros(RESAMPLE_HISTORY, dtype=np.float32))
+
+    def resize(self, frame_samples: int, history: Optional[np.ndarray] = None) -> None:
+        if history is None:
+            history = self.window[self.frame_samples:].copy()
+        self.frame_samples = frame_samples
+        self.window = np.empty(RESAMPLE_HISTORY + frame_samples, dtype=np.float32)
+        self.window[:RESAMPLE_HISTORY] = history
+        self.frames = sliding_window_view(self.window, len(_INGEST_TAPS))[::DECIMATION]
+        self.out = np.empty(self.frames.shape[0], dtype=np.float32)
+
+def _pcm_to_f32_mono16k(pcm: Union[bytes, memoryview], state: ResampleState) -> np.ndarray:
+    """
+    Downmix, low-pass, decimate and normalize one interleaved 48 kHz stereo int16 packet.
+    Returns a view of state.out, valid until the next call for the same speaker.
+    Discord frames are 960 samples, so the stride-3 phase stays aligned across packets.
+    """
+    # zero-copy int16 view over whole stereo frames only (frombuffer rejects a ragged tail)
+    n = len(pcm) // 4
+    stereo = np.frombuffer(pcm, dtype=np.int16, count=2 * n)
+    if n != state.frame_samples:
+        state.resize(n)
+    window = state.window
+    np.add(stereo[0::2], stereo[1::2], out=window[RESAMPLE_HISTORY:], dtype=np.float32)
+    # polyphase: only every DECIMATION-th output is ever computed
+    np.matmul(state.frames, _INGEST_TAPS, out=state.out)
+    window[:RESAMPLE_HISTORY] = window[n:]
+    return state.out
+
+class SpeakerRing:
+    """
+    Fixed-size float32 ring of one speaker's 16 kHz audio.
+    Indices are absolute sample counts (position = idx % capacity). write_idx is advanced by
+    two pushers, the ingest thread and flush_all's asyncio.to_thread(_drain_inbox), which
+    TranscribeSink._ingest_lock serializes; only the event loop advances read_idx/free_idx.
+    So the ring itself needs no lock (int stores are atomic under the GIL and a stale read
+    only ever under-reports room or pending audio). The worker claims
+    [read_idx, n) and releases it once Whisper is done, so claimed audio can be handed out
+    as a view without copying. Claims may be released out of order; free_idx only moves
+    past a claim once every earlier one is released too.
+    """
+    def __init__(self, capacity: int) -> None:
+        self.buf = np.zeros(capacity, dtype=np.float32)
+        self._scratch: Optional[np.ndarray] = None  # reused to unwrap claims that straddle the end
+        self.write_idx = 0
+        self.read_idx = 0
+        self.free_idx = 0
+        self._claim_ends: Deque[int] = collections.deque()  # outstanding claims, oldest first
+        self._released: Set[int] = set()
+
+    def pending(self) -> int:
+        return self.write_idx - self.read_idx
+
+    def push(self, samples: np.ndarray) -> int:
+        cap = self.buf.shape[0]
+        room = cap - (self.write_idx - self.free_idx)
+        n = min(samples.shape[0], room)
+        if n <= 0:
+            return samples.shape[0]
+        w = self.write_idx % cap
+        first = min(n, cap - w)
+        self.buf[w:w + first] = samples[:first]
+        self.buf[:n - first] = samples[first:n]
+        self.write_idx += n
+        return samples.shape[0] - n
+
+    def claim(self, n: int) -> Tuple[np.ndarray, int]:
+        cap = self.buf.shape[0]
+        n = min(n, self.pending())
+        r = self.read_idx % cap
+        if r + n <= cap:
+            audio = self.buf[r:r + n]
+        elif self.free_idx == self.read_idx:
+            # nothing else is claimed, so the scratch buffer is free to reuse
+            if self._scratch is None:
+                self._scratch = np.empty(cap, dtype=np.float32)
+            audio = self._scratch[:n]
+            np.concatenate((self.buf[r:], self.buf[:r + n - cap]), out=audio)
+        else:
+            audio = np.concatenate((self.buf[r:], self.buf[:r + n - cap]))
+        self.read_idx += n
+        self._claim_ends.append(self.read_idx)
+        return audio, self.read_idx
+
+    def release(self, end_idx: int) -> None:
+        self._released.add(end_idx)
+        while self._claim_ends and self._claim_ends[0] in self._released:
+            self._released.discard(self._claim_ends[0])
+            self.free_idx = self._claim_ends.popleft()
+
+class TranscribeQueue:
+    """
+    One queue shared by every recording session. A single consumer drains whatever has
+    queued up while Whisper was busy and sends it as one batch, so speakers in different
+    guilds share encoder passes and are served in arrival order.
+    Clips may be views into live buffers: a job's release callback runs once Whisper is
+    done reading them (or the job is dropped or skipped), never before.
+    """
+
+    def __init__(self, whisper: WhisperProcess, batch_max: int = BATCH_MAX, max_pending: int = MAX_PENDING_REQUESTS) -> None:
+        self.whisper = whisper
+        self.batch_max = batch_max
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def transcribe(self, audios: List[np.ndarray], prompts: Optional[List[str]] = None, release: Optional[Callable[[], None]] = None) -> List[str]:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._consume())
+        queue = self._queue
+        assert queue is not None
+        # backpressure: when Whisper can't keep up, shed the oldest work rather than let
+        # latency grow without bound
+        while queue.qsize() >= self.max_pending:
+            old_audios, _, old_fut, old_release = queue.get_nowait()
+            logger.warning("Transcription backlog full, dropped %d queued clip(s)", len(old_audios))
+            if not old_fut.done():
+                old_fut.set_result([""] * len(old_audios))
+            if old_release is not None:
+                old_release()
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((audios, prompts or [""] * len(audios), fut, release))
+        return await fut
+
+    async def _consume(self) -> None:
+        queue = self._queue
+        assert queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            items = []
+            count = 0
+            while not items or (count < self.batch_max and not queue.empty()):
+                item = queue.get_nowait() if items else await queue.get()
+                if item[2].done():
+                    # the caller was cancelled while this waited; don't decode it
+                    if item[3] is not None:
+                        item[3]()
+                    continue
+                items.append(item)
+                count += len(item[0])
+            audios = [a for clips, _, _, _ in items for a in clips]
+            prompts = [p for _, clip_prompts, _, _ in items for p in clip_prompts]
+            try:
+                texts = await loop.run_in_executor(_WHISPER_POOL, self.whisper.transcribe_clips, audios, LANG, prompts)
+            except Exception as e:
+                for _, _, fut, _ in items:
+                    if not fut.done():
+                        fut.set_exception(e)
+                texts = None
+            for _, _, _, release in items:
+                if release is not None:
+                    release()
+            if texts is None:
+                continue
+            offset = 0
+            for clips, _, fut, _ in items:
+                if not fut.done():
+                    fut.set_result(texts[offset:offset + len(clips)])
+                offset += len(clips)
+
+_TRANSCRIBE_QUEUE = TranscribeQueue(_whisper)
 
 class TranscribeSink(voice_recv.AudioSink):  # type: ignore
-    def __init__(self, loop: asyncio.AbstractEventLoop, post_channel: Messageable, model: WhisperModel, guild_id: int, transcript_path: Path, sr_in: int = SR_IN, sr_out: int = SR_OUT) -> None:
+    def __init__(self, loop: asyncio.AbstractEventLoop, post_channel: Messageable, transcriber: TranscribeQueue, guild_id: int, transcript_path: Path, sr_in: int = SR_IN, sr_out: int = SR_OUT) -> None:
         super().__init__()
         self.loop = loop
         self.post_channel = post_channel
-        self.model = model
+        self.transcriber = transcriber
         self.guild_id = guild_id
         self.transcript_path = transcript_path
         self.sr_in = sr_in
         self.sr_out = sr_out
         self._lock = threading.Lock()
-        self._buffers: Dict[str, Deque[np.ndarray]] = {}
+        self._rings: Dict[str, SpeakerRing] = {}
+        self._ring_capacity = int(MAX_BUFFER_SECONDS * sr_out) * 2
+        self._chunk_samples = int(CHUNK_SECONDS * sr_out)
+        self._min_speech_samples = int(MIN_SPEECH_SECONDS * sr_out)
+        self._ready = asyncio.Event()
         self._names: Dict[str, str] = {}
+        self._resample_state: Dict[str, ResampleState] = {}
+        self._decoders: Dict[str, discord.opus.Decoder] = {}
+        self._source_keys: Dict[Any, Tuple[str, str]] = {}  # voice source -> (key, display name)
         self._last_activity: Dict[str, float] = {}
+        self._gated = 0
+        self._gate_energy = RMS_GATE * RMS_GATE
+        self._quiet_packets: Dict[str, int] = {}
+        self._last_text: Dict[str, str] = {}
+        self._pending_posts: List[str] = []
+        self._pending_chars = 0
+        self._post_timer: Optional[asyncio.TimerHandle] = None
+        self._post_tasks: Set[asyncio.Task] = set()
         self._running = threading.Event()
         self._running.set()
-        self._worker_future: Optional[concurrent.futures.Future] = None
+        self._worker_task: Optional[asyncio.Task] = None
         self._stopped_accepting = threading.Event()
         self._stopped_accepting.clear()
+        # receive thread -> ingest thread handoff; deque append/popleft are thread-safe
+        self._inbox: Deque[Tuple[str, str, bytes, float]] = collections.deque()
+        self._inbox_ready = threading.Event()
+        self._ingest_lock = threading.Lock()
+        self._ingest_thread: Optional[threading.Thread] = None
 
     def wants_opus(self) -> bool:
-        return False
+        # take raw Opus so comfort-noise/silence frames are never decoded; see write()
+        return True
 
     def write(self, source: Any, data: Any) -> None:
+        # runs on the voice receive thread: only filter and hand off; decoding and
+        # resampling happen on the ingest thread so packet intake never waits on them
         try:
             if self._stopped_accepting.is_set():
                 return
-            pcm: Optional[bytes] = getattr(data, "pcm", None)
-            if not pcm:
+            opus: Optional[bytes] = getattr(data, "opus", None)
+            if not opus or opus == OPUS_SILENCE:
+                # lost packets and the silence frames Discord sends after speech stops
+                # carry nothing to transcribe; skip the decode and keep the ring idle
                 return
-            arr = _pcm_bytes_to_int16_array(pcm)
-            if arr.ndim == 1 and len(arr) % 2 == 0:
-                arr = arr.reshape(-1, 2)
-                arr = _downmix_stereo_to_mono_int16(arr)
-            else:
-                arr = _downmix_stereo_to_mono_int16(arr)
-            arr16 = _resample_48k_to_16k_mono_int16(arr)
-            key = str(getattr(source, "id", None) or getattr(source, "ssrc", None) or "unknown")
-            name = _display_name(source) if source else "unknown"
-            now = time.time()
-            with self._lock:
-                if key not in self._buffers:
-                    self._buffers[key] = deque()
-                    self._names[key] = name
-                self._buffers[key].append(arr16)
-                self._last_activity[key] = now
+            try:
+                key, name = self._source_keys[source]
+            except KeyError:
+                key = str(getattr(source, "id", None) or getattr(source, "ssrc", None) or "unknown")
+                name = _display_name(source) if source else "unknown"
+                self._source_keys[source] = (key, name)
+            self._inbox.append((key, name, opus, time.time()))
+            self._inbox_ready.set()
         except Exception as e:
             logger.exception("TranscribeSink.write error: %s", e)
 
+    def _ingest_loop(self) -> None:
+        while self._running.is_set():
+            self._inbox_ready.wait(timeout=0.5)
+            self._inbox_ready.clear()
+            self._drain_inbox()
+
+    def _drain_inbox(self) -> None:
+        with self._ingest_lock:
+            while True:
+                try:
+                    key, name, opus, arrived = self._inbox.popleft()
+                except IndexError:
+                    return
+                try:
+                    self._ingest(key, name, opus, arrived)
+                except Exception as e:
+                    logger.exception("TranscribeSink ingest error: %s", e)
+
+    def _ingest(self, key: str, name: str, opus: bytes, arrived: float) -> None:
+        decoder = self._decoders.get(key)
+        if decoder is None:
+            decoder = self._decoders[key] = discord.opus.Decoder()
+        pcm = decoder.decode(opus, fec=False)
+        state = self._resample_state.get(key)
+        if state is None:
+            state = self._resample_state[key] = ResampleState(self.sr_in // 50)
+        audio = _pcm_to_f32_mono16k(pcm, state)
+        # energy gate: once a speaker has been quiet for a short hangover, stop buffering
+        # their comfort noise and leave _last_activity alone so the pause ends the utterance
+        if float(np.dot(audio, audio)) < self._gate_energy * audio.size:
+            streak = self._quiet_packets.get(key, 0) + 1
+            self._quiet_packets[key] = streak
+            if streak > QUIET_PACKETS_KEPT:
+                return
+        else:
+            self._quiet_packets[key] = 0
+        ring = self._rings.get(key)
+        if ring is None:
+            with self._lock:
+                ring = self._rings[key] = SpeakerRing(self._ring_capacity)
+                self._names[key] = name
+        before = ring.pending()
+        dropped = ring.push(audio)
+        self._last_activity[key] = arrived
+        # wake the worker when a speaker starts talking, has enough audio for a pause to
+        # end the utterance, or crosses a full chunk; not on every packet
+        after = ring.pending()
+        if before == 0 or before < self._min_speech_samples <= after or before < self._chunk_samples <= after:
+            self.loop.call_soon_threadsafe(self._ready.set)
+        if dropped:
+            logger.warning("Audio buffer full for %s, dropped %d samples", name, dropped)
+
     def cleanup(self) -> None:
         self._running.clear()
         self._stopped_accepting.set()
+        self._inbox_ready.set()
 
     def start_worker(self) -> None:
-        if self._worker_future is None:
-            self._worker_future = asyncio.run_coroutine_threadsafe(self._worker(), self.loop)  # type: ignore
+        if self._ingest_thread is None:
+            self._ingest_thread = threading.Thread(target=self._ingest_loop, name=f"ingest-{self.guild_id}", daemon=True)
+            self._ingest_thread.start()
+        if self._worker_task is None:
+            self._worker_task = self.loop.create_task(self._worker())
 
     async def stop_accepting(self) -> None:
         self._stopped_accepting.set()
 
     async def stop_worker(self) -> None:
         self._running.clear()
+        self._ready.set()
+        self._inbox_ready.set()
 
     async def join_worker(self, timeout: float = 10.0) -> None:
-        fut = self._worker_future
-        self._worker_future = None
-        if fut is None:
+        task = self._worker_task
+        self._worker_task = None
+        if task is None:
             return
         try:
-            await asyncio.to_thread(_get_with_timeout, fut, timeout)
+            await asyncio.wait_for(task, timeout)
         except Exception as e:
             logger.warning("Worker join timed out or failed: %s", e)
 
-    def _pop_all(self, dq: Deque[np.ndarray]) -> List[np.ndarray]:
-        xs: List[np.ndarray] = []
-        while dq:
-            xs.append(dq.popleft())
-        return xs
-
-    async def _flush_speaker(self, key: str, reason: str) -> None:
-        with self._lock:
-            dq = self._buffers.get(key)
-            name = self._names.get(key, "unknown")
-            if not dq or len(dq) == 0:
-                return
-            samples = self._pop_all(dq)
-        mono16 = np.concatenate(samples)
-        if mono16.size == 0:
+    async def _flush_speakers(self, wants: List[Tuple[str, Optional[int]]], reason: str) -> None:
+        # claim every ready speaker at once so several speakers share one encoder pass
+        claims: List[Tuple[SpeakerRing, int, str, np.ndarray]] = []
+        for key, max_samples in wants:
+            ring = self._rings.get(key)
+            if not ring or ring.pending() == 0:
+                continue
+            audio_f32, end_idx = ring.claim(ring.pending() if max_samples is None else max_samples)
+            claims.append((ring, end_idx, key, audio_f32))
+        if not claims:
             return
-        audio_f32 = (mono16.astype(np.float32) / 32768.0)
+        loud: List[Tuple[SpeakerRing, int, str, np.ndarray]] = []
+        for claim in claims:
+            if _rms(claim[3]) >= RMS_GATE:
+                loud.append(claim)
+            else:
+                claim[0].release(claim[1])
+        if len(loud) < len(claims):
+            self._gated += len(claims) - len(loud)
+            logger.debug("RMS gate skipped %d clip(s) (flush=%s, total %d)", len(claims) - len(loud), reason, self._gated)
+        if not loud:
+            return
+
+        def release_loud() -> None:
+            for ring, end_idx, _, _ in loud:
+                ring.release(end_idx)
+
+        # the clips are views into the rings, so the queue releases them only once Whisper
+        # has finished reading; a cancelled flush (join_worker timing out) must not free
+        # audio a queued or running job still points at
         try:
-            loop = asyncio.get_running_loop()
-            text = await loop.run_in_executor(None, _do_transcribe, self.model, audio_f32, LANG)
+            audios = [audio_f32 for _, _, _, audio_f32 in loud]
+            prompts = [self._last_text.get(key, "") for _, _, key, _ in loud]
+            texts = await self.transcriber.transcribe(audios, prompts, release=release_loud)
         except Exception as e:
-            logger.exception("Transcribe error (flush=%s) for %s: %s", reason, name, e)
+            names = ", ".join(self._names.get(key, "unknown") for _, _, key, _ in loud)
+            logger.exception("Transcribe error (flush=%s) for %s: %s", reason, names, e)
             return
-        text = (text or "").strip()
-        if not text:
-            return
-        transcripts.append_line(self.guild_id, text, speaker=name, fallback_path=self.transcript_path)
-        sec = mono16.size / SR_OUT
-        if sec >= MIN_SECONDS_TO_POST:
+        lines: List[str] = []
+        for (_, _, key, audio_f32), text in zip(loud, texts):
+            text = (text or "").strip()
+            if not text:
+                continue
+            name = self._names.get(key, "unknown")
+            # the speaker's recent words prime the next decode (names, spelling, topic)
+            self._last_text[key] = " ".join(f"{self._last_text.get(key, '')} {text}".split()[-PROMPT_WORDS:])
+            transcripts.append_line(self.guild_id, text, speaker=name, fallback_path=self.transcript_path)
+            sec = audio_f32.size / SR_OUT
+            if sec >= MIN_SECONDS_TO_POST:
+                lines.append(f"**{name}:** {text}")
+        if lines:
+            self._queue_posts(lines)
+
+    def _queue_posts(self, lines: List[str]) -> None:
+        # lines from flushes landing close together go out as one message, which keeps us
+        # clear of the channel's rate limit when several people talk at once
+        self._pending_posts.extend(lines)
+        self._pending_chars += sum(len(line) + 1 for line in lines)
+        if self._pending_chars >= DISCORD_MESSAGE_LIMIT - 100:
+            if self._post_timer is not None:
+                self._post_timer.cancel()
+            self._start_post_flush()
+        elif self._post_timer is None:
+            self._post_timer = self.loop.call_later(POST_COALESCE_SECONDS, self._start_post_flush)
+
+    def _start_post_flush(self) -> None:
+        self._post_timer = None
+        task = self.loop.create_task(self._send_pending_posts())
+        self._post_tasks.add(task)
+        task.add_done_callback(self._post_tasks.discard)
+
+    async def _send_pending_posts(self) -> None:
+        lines, self._pending_posts, self._pending_chars = self._pending_posts, [], 0
+        for content in _pack_messages(lines):
             try:
-                await self.post_channel.send(f"**{name}:** {text}")
+                await self.post_channel.send(content)
             except Exception as e:
                 logger.exception("Failed to post transcript: %s", e)
 
     async def _worker(self) -> None:
-        chunk = int(CHUNK_SECONDS * SR_OUT)
+        chunk = self._chunk_samples
         cap = int(MAX_BUFFER_SECONDS * SR_OUT)
+        min_speech = self._min_speech_samples
+        wait: float = CHUNK_SECONDS
         while self._running.is_set():
-            await asyncio.sleep(0.3)
+            # sleep until _ingest signals or the earliest pause/idle deadline passes
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            self._ready.clear()
+            wait = CHUNK_SECONDS
             with self._lock:
-                keys = list(self._buffers.keys())
+                keys = list(self._rings.keys())
             now = time.time()
+            wants: List[Tuple[str, Optional[int]]] = []
             for key in keys:
-                with self._lock:
-                    dq = self._buffers.get(key)
-                    name = self._names.get(key, "unknown")
-                    last = self._last_activity.get(key, 0.0)
-                    total = sum(len(x) for x in dq) if dq else 0
-                if not dq or total == 0:
+                ring = self._rings.get(key)
+                last = self._last_activity.get(key, 0.0)
+                total = ring.pending() if ring else 0
+                if total == 0:
                     continue
-                idle = (now - last) >= IDLE_FLUSH_SECONDS
+                # Discord stops sending a speaker's packets once they go quiet, and _ingest
+                # drops comfort noise past a short hangover, so a gap in buffered packets
+                # is the speech->silence transition
+                pause = SPEECH_END_SECONDS if total >= min_speech else IDLE_FLUSH_SECONDS
+                idle = (now - last) >= pause
                 over_chunk = total >= chunk
                 over_cap = total >= cap
                 if idle or over_cap:
-                    await self._flush_speaker(key, reason="idle" if idle else "cap")
-                    continue
-                if over_chunk:
-                    with self._lock:
-                        samples: List[np.ndarray] = []
-                        have = 0
-                        while dq and have < chunk:
-                            part = dq.popleft()
-                            samples.append(part)
-                            have += len(part)
-                    if not samples:
-                        continue
-                    mono16 = np.concatenate(samples)
-                    if mono16.size == 0:
-                        continue
-                    audio_f32 = (mono16.astype(np.float32) / 32768.0)
-                    try:
-                        loop = asyncio.get_running_loop()
-                        text = await loop.run_in_executor(None, _do_transcribe, self.model, audio_f32, LANG)
-                    except Exception as e:
-                        logger.exception("Transcribe error for %s: %s", name, e)
-                        continue
-                    text = (text or "").strip()
-                    if not text:
-                        continue
-                    transcripts.append_line(self.guild_id, text, speaker=name, fallback_path=self.transcript_path)
-                    sec = mono16.size / SR_OUT
-                    if sec >= MIN_SECONDS_TO_POST:
-                        try:
-                            await self.post_channel.send(f"**{name}:** {text}")
-                        except Exception as e:
-                            logger.exception("Failed to post transcript: %s", e)
+                    wants.append((key, None))
+                elif over_chunk:
+                    wants.append((key, chunk))
+                else:
+                    wait = min(wait, max(0.05, last + pause - now))
+            if wants:
+                await self._flush_speakers(wants, reason="tick")
+                wait = 0  # rescan at once; more audio arrived while Whisper was busy
         return
 
     async def flush_all(self) -> None:
+        # packets still waiting on the ingest thread belong in the final flush
+        await asyncio.to_thread(self._drain_inbox)
         with self._lock:
-            keys = list(self._buffers.keys())
-        for key in keys:
-            await self._flush_speaker(key, reason="final")
+            keys = list(self._rings.keys())
+        await self._flush_speakers([(key, None) for key in keys], reason="final")
+        if self._post_timer is not None:
+            self._post_timer.cancel()
+            self._post_timer = None
+        if self._post_tasks:
+            await asyncio.gather(*self._post_tasks, return_exceptions=True)
+        await self._send_pending_posts()
 
 class Session:
     def __init__(self, vc: voice_recv.VoiceRecvClient, sink: TranscribeSink) -> None:  # type: ignore
@@ -353,6 +722,8 @@ def _has_active_transcript(guild_id: Optional[int]) -> bool:
 def _utc_now_str() -> str:
     return datetime.now(timezone.utc).isoformat(timespec="seconds")
 
+_asset_cmds: Optional[AssetCommands] = None
+
 async def setup_hook() -> None:
     @tree.command(name="record", description="Start or continue recording this voice channel and post transcripts.")
     async def record_cmd(interaction: discord.Interaction) -> None:
@@ -362,8 +733,9 @@ async def setup_hook() -> None:
     async def stop_cmd(interaction: discord.Interaction) -> None:
         await _cmd_stop(interaction)
 
-    asset_cmds = setup_asset_commands(client, tree)
-    add_stats_command(tree, asset_cmds)
+    global _asset_cmds
+    _asset_cmds = await setup_asset_commands(client, tree)
+    add_stats_command(tree, _asset_cmds)
 
     @tree.command(name="scene", description="Insert a scene break into the transcript and post a divider.")
     @app_commands.describe(title="Short scene title, e.g., 'Into the Woods'")
@@ -416,6 +788,15 @@ client.setup_hook = setup_hook
 async def on_ready() -> None:
     logger.info(f"READY as {client.user}")
 
+@client.event
+async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel) -> None:
+    _POST_CHANNEL_CACHE.pop(after.guild.id, None)
+
+@client.event
+async def on_guild_update(before: discord.Guild, after: discord.Guild) -> None:
+    if before.system_channel != after.system_channel:
+        _POST_CHANNEL_CACHE.pop(after.id, None)
+
 async def _cmd_record(interaction: discord.Interaction) -> None:
     g = interaction.guild
     if g is None:
@@ -426,19 +807,20 @@ async def _cmd_record(interaction: discord.Interaction) -> None:
     if channel is None or not isinstance(channel, discord.VoiceChannel):
         await interaction.response.send_message("You are not in a voice channel.", ephemeral=True)
         return
-    post_channel = _choose_post_channel(interaction)
-    if post_channel is None:
-        await interaction.response.send_message("I do not have permission to post in any text channel here.", ephemeral=True)
-        return
     existing = SESSIONS.get(g.id)
     if existing and existing.vc and existing.vc.is_connected():
+        # reuse the session's post channel rather than rescanning the guild's channels
         with contextlib.suppress(Exception):
             existing.sink.start_worker()
         await interaction.response.send_message(
-            f"Already recording in {channel.name}. Posting to {getattr(post_channel, 'mention', '#text-channel')}.",
+            f"Already recording in {channel.name}. Posting to {getattr(existing.sink.post_channel, 'mention', '#text-channel')}.",
             ephemeral=True,
         )
         return
+    post_channel = _choose_post_channel(interaction)
+    if post_channel is None:
+        await interaction.response.send_message("I do not have permission to post in any text channel here.", ephemeral=True)
+        return
     await interaction.response.defer(ephemeral=True)
     transcript_path = transcripts.start_session(g, channel if isinstance(channel, discord.abc.GuildChannel) else None)
     try:
@@ -447,7 +829,7 @@ async def _cmd_record(interaction: discord.Interaction) -> None:
         transcripts.stop_session(g.id)
         await interaction.followup.send("Could not join the voice channel.", ephemeral=True)
         return
-    sink = TranscribeSink(loop=asyncio.get_running_loop(), post_channel=post_channel, model=_model, guild_id=g.id, transcript_path=transcript_path, sr_in=SR_IN, sr_out=SR_OUT)
+    sink = TranscribeSink(loop=asyncio.get_running_loop(), post_channel=post_channel, transcriber=_TRANSCRIBE_QUEUE, guild_id=g.id, transcript_path=transcript_path, sr_in=SR_IN, sr_out=SR_OUT)
     try:
         vc.listen(sink)
     except Exception:
@@ -495,6 +877,12 @@ def main() -> None:
         client.run(TOKEN, log_handler=None)
     except KeyboardInterrupt:
         print("KeyboardInterrupt: shutting down.")
+    finally:
+        _WHISPER_POOL.shutdown(wait=False)
+        _whisper.close()
+        transcripts.close_all()
+        if _asset_cmds is not None:
+            _asset_cmds.close()
 
 if __name__ == "__main__":
     main()
@@ -4,21 +4,27 @@ Campaign Asset Search Module for FreshBot
 Provides improved fuzzy search and constrained random for art and D&D maps with file caching.
 - Supports PNG/JPG/WEBP/BMP/GIF/SVG/PDF discovery
 - Auto-rasterizes SVG to PNG before upload (Discord doesn't preview SVG)
-- 10 MB upload cap to avoid 413 errors on free servers
+- Upload cap of 10 MB, or the 50/100 MB that boost tiers 2 and 3 unlock, to avoid 413 errors
 - Smarter matching with tokenization, phrase and exclude operators, and edit-distance penalty
 - Constrained random commands that pick from on-theme results
 """
 
 import asyncio
+import concurrent.futures
 import json
+import operator
+import os
 import hashlib
-import subprocess
+import heapq
+import io
 import tempfile
 import shutil
-import contextlib
+import functools
 import random
 import re
-from typing import List, Tuple, Optional, Dict, Iterable
+import threading
+from typing import List, Tuple, Optional, Dict, Iterable, Iterator, Set, FrozenSet, NamedTuple
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime, timezone
 
@@ -28,31 +34,109 @@ from discord import app_commands
 
 # ---------- utilities ----------
 
-def _rasterize_svg(svg_path: Path) -> Optional[Path]:
+_UNDERSCORE_DASH = str.maketrans({"_": " ", "-": " "})
+
+
+_SVG_CACHE_DIR = Path(tempfile.gettempdir()) / "freshbot_svg"
+
+
+_magick: Optional[str] = None
+
+
+def _magick_path() -> Optional[str]:
+    # a PATH search per render adds up on Windows, so a hit is remembered; a miss is
+    # retried next time in case ImageMagick was installed since
+    global _magick
+    if _magick is None:
+        _magick = shutil.which("magick")
+    return _magick
+
+
+async def _rasterize_svg(svg_path: Path) -> Optional[Path]:
     """
-    Convert an SVG to a temporary PNG with alpha preserved.
-    Requires ImageMagick `magick` on PATH.
+    Convert an SVG to a PNG with alpha preserved, cached by path and mtime so repeat
+    requests skip ImageMagick entirely. Runs `magick` as an async subprocess, so the
+    event loop keeps going while it renders. Requires ImageMagick `magick` on PATH.
     Returns output PNG Path or None on failure.
     """
-    if shutil.which("magick") is None:
+    try:
+        mtime_ns = svg_path.stat().st_mtime_ns
+    except OSError:
+        return None
+    key = hashlib.blake2b(str(svg_path.resolve()).encode(), digest_size=6).hexdigest()
+    out = _SVG_CACHE_DIR / f"{svg_path.stem}_{key}_{mtime_ns}.png"
+    if out.exists():
+        return out
+
+    magick = _magick_path()
+    if magick is None:
         return None
 
-    out = Path(tempfile.gettempdir()) / f"{svg_path.stem}.png"
-    cmd = [
-        "magick",
-        str(svg_path),
-        "-background", "none",
-        "-density", "300",
-        "-resize", "2048x2048>",
-        str(out),
-    ]
+    _SVG_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    partial = out.with_suffix(".part.png")
     try:
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return out if out.exists() else None
+        proc = await asyncio.create_subprocess_exec(
+            magick,
+            str(svg_path),
+            "-background", "none",
+            "-density", "300",
+            "-resize", "2048x2048>",
+            str(partial),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        if await proc.wait() != 0 or not partial.exists():
+            return None
+        os.replace(partial, out)
+        return out
     except Exception:
         return None
 
 
+def _walk_files(root: str) -> Iterator[Tuple[Tuple[str, ...], str, os.stat_result]]:
+    """
+    Yield (parent directory parts relative to root, file name, stat) for every file under root.
+    os.scandir reports file/dir type from the directory listing itself, and each entry's
+    stat() is cached on the entry (free on Windows), so every file is stat'ed at most once
+    and no Path objects are built. Hidden directories and symlinks are skipped, so a link
+    loop can't recurse forever and the walk agrees with get_quick_signature.
+    """
+    stack: List[Tuple[str, Tuple[str, ...]]] = [(root, ())]
+    while stack:
+        path, parts = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs: List[Tuple[str, Tuple[str, ...]]] = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    # hidden folders (.git, thumbnail caches, ...) never hold assets
+                    if not entry.name.startswith("."):
+                        subdirs.append((entry.path, parts + (entry.name,)))
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue  # vanished or unreadable mid-scan
+            yield parts, entry.name, st
+        stack.extend(reversed(subdirs))
+
+
+def _listing_digest(lines: List[str]) -> str:
+    """Order-independent digest of "rel_path:mtime:size" lines, used as the folder hash."""
+    # blake2b is faster than md5 here; lines are fed one at a time so the
+    # whole listing never has to be joined into a single string
+    digest = hashlib.blake2b(digest_size=16)
+    for line in sorted(lines):
+        digest.update(line.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
 def _load_synonyms(path: Path = Path("synonyms.json")) -> Dict[str, List[str]]:
     """
     Load optional synonyms. Format:
@@ -76,21 +160,39 @@ def _load_synonyms(path: Path = Path("synonyms.json")) -> Dict[str, List[str]]:
     return {}
 
 
+_SEPARATORS_RE = re.compile(r"[_\-]+")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_ALNUM_RE = re.compile(r"[a-z0-9]+")
+
+
 def _normalize_text(s: str) -> str:
     # Lowercase and spaces for matching
-    return re.sub(r"[_\-]+", " ", s).lower()
+    return _SEPARATORS_RE.sub(" ", s).lower()
 
 
 def _tokenize(s: str) -> List[str]:
     # Split on non-alphanumerics and camelcase boundaries
     s = _normalize_text(s)
-    parts = re.split(r"[^a-z0-9]+", s)
+    parts = _NON_ALNUM_RE.split(s)
     return [p for p in parts if p]
 
 
+@functools.lru_cache(maxsize=1024)
+def _char_masks(a: str) -> Dict[str, int]:
+    # bit i of masks[c] is set where a[i] == c
+    masks: Dict[str, int] = {}
+    for i, c in enumerate(a):
+        masks[c] = masks.get(c, 0) | (1 << i)
+    return masks
+
+
+@functools.lru_cache(maxsize=65536)
 def _levenshtein(a: str, b: str, max_distance: int = 3) -> int:
     """
-    Simple Levenshtein distance with an optional early exit when distance exceeds max_distance.
+    Levenshtein distance with an early exit when distance exceeds max_distance.
+    Bit-parallel (Myers/Hyyro): one pass over b with a handful of integer ops per
+    character instead of a len(a) x len(b) table. Memoized, since query terms are compared
+    against the same folder and file-name tokens over and over.
     """
     if a == b:
         return 0
@@ -102,43 +204,107 @@ def _levenshtein(a: str, b: str, max_distance: int = 3) -> int:
     if lb == 0:
         return la
 
-    prev = list(range(lb + 1))
-    curr = [0] * (lb + 1)
-    for i in range(1, la + 1):
-        curr[0] = i
-        ai = a[i - 1]
-        row_min = curr[0]
-        for j in range(1, lb + 1):
-            cost = 0 if ai == b[j - 1] else 1
-            curr[j] = min(
-                prev[j] + 1,       # deletion
-                curr[j - 1] + 1,   # insertion
-                prev[j - 1] + cost # substitution
-            )
-            if curr[j] < row_min:
-                row_min = curr[j]
-        if row_min > max_distance:
+    masks = _char_masks(a)
+    full = (1 << la) - 1
+    high = 1 << (la - 1)
+    vp, vn, dist = full, 0, la
+    # the score moves by at most 1 per remaining character of b
+    remaining = lb
+    for c in b:
+        remaining -= 1
+        eq = masks.get(c, 0)
+        xv = eq | vn
+        xh = (((eq & vp) + vp) ^ vp) | eq
+        hp = vn | (~(xh | vp) & full)
+        hn = vp & xh
+        if hp & high:
+            dist += 1
+        elif hn & high:
+            dist -= 1
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = hn | (~(xv | hp) & full)
+        vn = hp & xv
+        if dist - remaining > max_distance:
             return max_distance + 1
-        prev, curr = curr, prev
-    return prev[lb]
+    return dist if dist <= max_distance else max_distance + 1
 
 
-def _parse_query(query: str) -> Dict[str, Iterable[str]]:
+@functools.lru_cache(maxsize=256)
+def _token_prefix_pattern(term: str) -> Optional["re.Pattern[str]"]:
+    """
+    Regex equivalent to "some token of the text starts with term": the term preceded by
+    a token boundary. One C-level search instead of a Python loop over the tokens.
+    Only valid for plain [a-z0-9] terms, since tokens never contain anything else.
+    """
+    if not _ALNUM_RE.fullmatch(term):
+        return None
+    return re.compile(r"(?<![a-z0-9])" + term)
+
+
+@functools.lru_cache(maxsize=256)
+def _any_term_pattern(terms: Tuple[str, ...]) -> Optional["re.Pattern[str]"]:
+    """One alternation matching any of the terms, longest first; None if there are none."""
+    words = sorted({t for t in terms if t}, key=len, reverse=True)
+    if not words:
+        return None
+    return re.compile("|".join(map(re.escape, words)))
+
+
+def _top_results(
+    results: List[Tuple[float, str, Path, int]], limit: int
+) -> List[Tuple[str, Path, int]]:
+    # nlargest is O(N log k) and, like a stable sort, keeps scan order among equal scores
+    top = heapq.nlargest(max(1, min(limit, 50)), results, key=operator.itemgetter(0))
+    return [r[1:] for r in top]
+
+
+def _closest_distance(term: str, tokens: Iterable[str], max_distance: int = 3) -> int:
+    """
+    Smallest edit distance from term to any token, capped at max_distance + 1. Only
+    called once term is known not to be a token, so 1 is the best possible and ends
+    the scan.
+    """
+    best = max_distance + 1
+    n = len(term)
+    for t in tokens:
+        # tokens whose length differs by more than max_distance can't be close enough
+        if abs(len(t) - n) > max_distance:
+            continue
+        d = _levenshtein(term, t, max_distance)
+        if d < best:
+            best = d
+            if d <= 1:
+                break
+    return best
+
+
+class ParsedQuery(NamedTuple):
+    phrases: Tuple[str, ...]
+    include: Tuple[str, ...]
+    exclude: Tuple[str, ...]
+
+
+_PHRASE_RE = re.compile(r'"([^"]+)"')
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_query(query: str) -> ParsedQuery:
     """
     Parse query with support for:
       - phrases in quotes: "red dragon"
       - excludes: -word
       - regular words
-    Returns dict with keys: phrases, include, exclude
+    Memoized, since tables tend to repeat the same searches.
     """
     phrases: List[str] = []
     include: List[str] = []
     exclude: List[str] = []
 
-    for m in re.finditer(r'"([^"]+)"', query):
+    for m in _PHRASE_RE.finditer(query):
         phrases.append(m.group(1).strip().lower())
 
-    query_wo_phrases = re.sub(r'"[^"]+"', " ", query)
+    query_wo_phrases = _PHRASE_RE.sub(" ", query)
     for tok in query_wo_phrases.split():
         tok = tok.strip()
         if not tok:
@@ -148,29 +314,43 @@ def _parse_query(query: str) -> Dict[str, Iterable[str]]:
         else:
             include.append(tok.lower())
 
-    return {"phrases": phrases, "include": include, "exclude": exclude}
+    return ParsedQuery(tuple(phrases), tuple(include), tuple(exclude))
 
 
 class AssetCache:
     """Handles caching of file metadata for fast searches"""
 
+    VERSION = "2.0"  # bump when the per-folder columns change shape
+
     def __init__(self, cache_file: str = "asset_cache.json"):
         self.cache_file = Path(cache_file)
-        self.cache_data: Dict = {}
+        self.cache_data: Dict = {"version": self.VERSION, "folders": {}}
+        self._lock = threading.Lock()  # folders may be cached from parallel scan threads
+        self._dirty = False
+        self._token_index: Dict[str, Dict[str, List[int]]] = {}  # folder -> token -> row ids
+        self._prefix_index: Dict[str, Dict[str, List[int]]] = {}  # folder -> 3-char prefix -> row ids
+        self._rows: Dict[str, List[Tuple]] = {}  # folder -> zipped search columns
+        # Folders checked against disk since the process started. Files added while the bot
+        # runs are picked up by /refresh_cache, so later commands skip the walk entirely.
+        self._validated: Set[str] = set()
+        self.generation = 0  # bumped whenever any folder's columns are replaced
         self.load_cache()
 
     def load_cache(self) -> None:
         try:
             if self.cache_file.exists():
-                with open(self.cache_file, "r", encoding="utf-8") as f:
-                    self.cache_data = json.load(f)
+                data = json.loads(self.cache_file.read_bytes())
+                if data.get("version") == self.VERSION:
+                    self.cache_data = data
         except Exception:
-            self.cache_data = {"version": "1.0", "folders": {}}
+            self.cache_data = {"version": self.VERSION, "folders": {}}
 
     def save_cache(self) -> None:
+        # compact, and written to a temp file first so a crash never leaves half a cache behind
+        tmp = self.cache_file.with_suffix(".tmp")
         try:
-            with open(self.cache_file, "w", encoding="utf-8") as f:
-                json.dump(self.cache_data, f, indent=2)
+            tmp.write_bytes(json.dumps(self.cache_data, separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp, self.cache_file)
         except Exception as e:
             print(f"Warning: Could not save asset cache: {e}")
 
@@ -178,19 +358,54 @@ class AssetCache:
         if not folder.exists():
             return "empty"
 
-        file_info: List[str] = []
         try:
-            for file_path in folder.rglob("*"):
-                if file_path.is_file():
-                    stat = file_path.stat()
-                    file_info.append(
-                        f"{file_path.relative_to(folder)}:{stat.st_mtime}:{stat.st_size}"
-                    )
+            file_info = [
+                f"{os.path.join(*parts, name)}:{st.st_mtime}:{st.st_size}"
+                for parts, name, st in _walk_files(str(folder))
+            ]
         except Exception:
             return "error"
+        return _listing_digest(file_info)
+
+    def get_quick_signature(self, folder: Path) -> List[float]:
+        """
+        Cheap change detector: [file count, newest directory mtime].
+        Adding, removing or renaming a file bumps its directory's mtime, so this catches
+        every change the index cares about while only stat-ing directories.
+        """
+        if not folder.exists():
+            return [0, 0.0]
 
-        content = "\n".join(sorted(file_info))
-        return hashlib.md5(content.encode()).hexdigest()
+        count = 0
+        newest = 0.0
+        stack = [str(folder)]
+        try:
+            while stack:
+                path = stack.pop()
+                newest = max(newest, os.stat(path).st_mtime)
+                with os.scandir(path) as it:
+                    for entry in it:
+                        # same rules as _walk_files: no symlinks, no hidden folders
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if not entry.name.startswith("."):
+                                    stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                count += 1
+                        except OSError:
+                            continue
+        except OSError:
+            return [-1, 0.0]
+        return [count, newest]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.cache_data = {"version": self.VERSION, "folders": {}}
+            self._token_index.clear()
+            self._prefix_index.clear()
+            self._rows.clear()
+            self._validated.clear()
+            self.generation += 1
 
     def is_folder_cached(self, folder: Path) -> bool:
         if "folders" not in self.cache_data:
@@ -199,52 +414,193 @@ class AssetCache:
         folder_str = str(folder)
         if folder_str not in self.cache_data["folders"]:
             return False
+        entry = self.cache_data["folders"][folder_str]
+        if "sizes" not in entry:
+            return False  # written by an older version without search columns
+
+        if folder_str in self._validated:
+            return True
 
-        cached_hash = self.cache_data["folders"][folder_str].get("hash", "")
-        current_hash = self.get_folder_hash(folder)
-        return cached_hash == current_hash
+        quick_sig = self.get_quick_signature(folder)
+        if entry.get("quick_sig") != quick_sig:
+            # a directory was touched; only the full content hash can say whether files changed
+            if entry.get("hash", "") != self.get_folder_hash(folder):
+                return False
+            entry["quick_sig"] = quick_sig
+            self._dirty = True
+
+        self._validated.add(folder_str)
+        return True
 
     def get_cached_files(self, folder: Path) -> List[Tuple[str, str]]:
-        folder_str = str(folder)
-        if folder_str in self.cache_data.get("folders", {}):
-            return self.cache_data["folders"][folder_str].get("files", [])
-        return []
+        entry = self.cache_data.get("folders", {}).get(str(folder), {})
+        return list(zip(entry.get("names", []), entry.get("rel_paths", [])))
 
-    def cache_folder(self, folder: Path, files: List[Tuple[str, str]]) -> None:
+    def get_search_columns(self, folder: Path) -> Dict[str, List]:
+        """Parallel per-file columns (names, rel_paths, sizes, searchable, tokens, parents)."""
+        return self.cache_data.get("folders", {}).get(str(folder), {})
+
+    def cache_folder(
+        self, folder: Path, files: List[Tuple[str, str, int]], folder_hash: Optional[str] = None
+    ) -> None:
+        """
+        Store the search columns for a folder. Pass folder_hash when the caller has just
+        walked the tree anyway, to avoid a second walk through get_folder_hash.
+        """
         if "folders" not in self.cache_data:
             self.cache_data["folders"] = {}
 
+        # normalized search fields only change when the folder does, so compute them
+        # here once instead of on every query
+        searchable: List[str] = []
+        tokens: List[List[str]] = []
+        parents: List[str] = []
+        for display_name, rel_path, _size in files:
+            text = f"{_normalize_text(display_name)} {_normalize_text(rel_path)}"
+            searchable.append(text)
+            tokens.append(sorted(set(_tokenize(text))))
+            parents.append(_normalize_text("/".join(rel_path.split("/")[:-1])))
+
         folder_str = str(folder)
-        self.cache_data["folders"][folder_str] = {
-            "hash": self.get_folder_hash(folder),
-            "files": files,
+        entry = {
+            "hash": folder_hash if folder_hash is not None else self.get_folder_hash(folder),
+            "quick_sig": self.get_quick_signature(folder),
+            "names": [f[0] for f in files],
+            "rel_paths": [f[1] for f in files],
+            "sizes": [f[2] for f in files],
+            "searchable": searchable,
+            "tokens": tokens,
+            "parents": parents,
             "cached_at": datetime.now(timezone.utc).isoformat(),
         }
-        self.save_cache()
+        with self._lock:
+            self.cache_data["folders"][folder_str] = entry
+            self._token_index.pop(folder_str, None)
+            self._prefix_index.pop(folder_str, None)
+            self._rows.pop(folder_str, None)
+            self._validated.add(folder_str)
+            self.generation += 1
+            self._dirty = True
+
+    def get_token_index(self, folder: Path) -> Dict[str, List[int]]:
+        """Inverted index token -> row ids, built lazily from the cached token column."""
+        self._build_indexes(folder)
+        return self._token_index[str(folder)]
+
+    def get_rows(self, folder: Path) -> List[Tuple[str, str, int, str, FrozenSet[str], str]]:
+        """
+        (name, rel_path, size, searchable, tokens, parents) per file. Zipped once per cached
+        folder rather than per query; indexes from get_token_index refer to this list.
+        Tokens become frozensets so the per-term membership tests are O(1).
+        """
+        folder_str = str(folder)
+        rows = self._rows.get(folder_str)
+        if rows is None:
+            cols = self.get_search_columns(folder)
+            rows = list(zip(
+                cols.get("names", []),
+                cols.get("rel_paths", []),
+                cols.get("sizes", []),
+                cols.get("searchable", []),
+                [frozenset(t) for t in cols.get("tokens", [])],
+                cols.get("parents", []),
+            ))
+            self._rows[folder_str] = rows
+        return rows
+
+    def get_prefix_index(self, folder: Path) -> Dict[str, List[int]]:
+        """Row ids by the first 3 characters of each of their tokens (of 3+ characters)."""
+        self._build_indexes(folder)
+        return self._prefix_index[str(folder)]
+
+    def _build_indexes(self, folder: Path) -> None:
+        folder_str = str(folder)
+        if folder_str in self._token_index:
+            return
+        index: Dict[str, List[int]] = {}
+        prefixes: Dict[str, List[int]] = {}
+        for row, toks in enumerate(self.get_search_columns(folder).get("tokens", [])):
+            seen: Set[str] = set()
+            for tok in toks:
+                index.setdefault(tok, []).append(row)
+                if len(tok) >= 3 and tok[:3] not in seen:
+                    seen.add(tok[:3])
+                    prefixes.setdefault(tok[:3], []).append(row)
+        self._prefix_index[folder_str] = prefixes
+        self._token_index[folder_str] = index
+
+    def flush(self) -> None:
+        """Write the cache to disk if anything changed since the last flush."""
+        with self._lock:
+            if self._dirty:
+                self.save_cache()
+                self._dirty = False
+
+
+# up to this size an upload is read into memory in one go; boosted guilds allow up to
+# 100 MB, which is streamed from the open file instead
+_BUFFERED_UPLOAD_MAX = 8 * 1024 * 1024
+
+
+def _open_upload(path: Path) -> io.IOBase:
+    f = open(path, "rb")
+    try:
+        if os.fstat(f.fileno()).st_size > _BUFFERED_UPLOAD_MAX:
+            return f
+        with f:
+            return io.BytesIO(f.read())
+    except BaseException:
+        f.close()
+        raise
+
+
+async def _read_upload(path: Path, filename: str) -> discord.File:
+    """
+    Open an upload on a worker thread. discord.File(path) opens and reads the file on the
+    event loop, which stalls the gateway heartbeat on slow disks. Small files are read
+    into memory there; larger ones (boost tiers 2 and 3 allow 50/100 MB) are handed to
+    discord.File as an open file and streamed, so they are never held in memory whole.
+    """
+    fp = await asyncio.to_thread(_open_upload, path)
+    return discord.File(fp, filename=filename)
+
+
+_BASE_UPLOAD_LIMIT = 10 * 1024 * 1024
+
+
+def _upload_limit(guild: Optional[discord.Guild]) -> int:
+    """10 MB, or the 50/100 MB cap that boost tiers 2 and 3 unlock."""
+    if guild is not None and guild.premium_tier >= 2:
+        return max(_BASE_UPLOAD_LIMIT, guild.filesize_limit)
+    return _BASE_UPLOAD_LIMIT
+
+
+def _upload_size(path: Path, cached_size: int, max_size: int) -> int:
+    """Size recorded at scan time; the file is only stat'ed again when it is near the limit."""
+    if 0 <= cached_size < max_size * 0.95:
+        return cached_size
+    return path.stat().st_size
+
+
+@functools.lru_cache(maxsize=1024)
+def _make_option(index: int, name: str, filename: str) -> discord.SelectOption:
+    # sessions keep searching for the same maps, so identical options are shared across views
+    display_name = name.translate(_UNDERSCORE_DASH)
+    if len(display_name) > 100:
+        display_name = display_name[:97] + "..."
+    return discord.SelectOption(label=display_name, value=str(index), description=f"File: {filename}")
 
 
 class AssetView(discord.ui.View):
     """Interactive view for selecting from multiple asset matches"""
 
-    def __init__(self, assets: List[Tuple[str, Path]], search_term: str, asset_type: str):
+    def __init__(self, assets: List[Tuple[str, Path, int]], search_term: str, asset_type: str):
         super().__init__(timeout=60.0)
         self.assets = assets[:25]
         self.search_term = search_term
         self.asset_type = asset_type
 
-        options: List[discord.SelectOption] = []
-        for i, (name, path) in enumerate(self.assets):
-            display_name = name.replace("_", " ").replace("-", " ")
-            if len(display_name) > 100:
-                display_name = display_name[:97] + "..."
-
-            options.append(
-                discord.SelectOption(
-                    label=display_name,
-                    value=str(i),
-                    description=f"File: {path.name}",
-                )
-            )
+        options = [_make_option(i, name, path.name) for i, (name, path, _size) in enumerate(self.assets)]
 
         self.asset_select = discord.ui.Select(
             placeholder=f"Choose a {asset_type} (found {len(assets)} matches)...",
@@ -260,7 +616,7 @@ class AssetView(discord.ui.View):
             await interaction.response.defer()
 
             index = int(self.asset_select.values[0])
-            name, orig_path = self.assets[index]
+            name, orig_path, cached_size = self.assets[index]
 
             if not orig_path.exists():
                 await interaction.edit_original_response(
@@ -269,34 +625,30 @@ class AssetView(discord.ui.View):
                 return
 
             send_path = orig_path
-            cleanup: Optional[Path] = None
             if orig_path.suffix.lower() == ".svg":
-                png = _rasterize_svg(orig_path)
-                if png and png.exists():
+                png = await _rasterize_svg(orig_path)
+                if png:
                     send_path = png
-                    cleanup = png
+                    cached_size = -1
 
-            file_size = send_path.stat().st_size
-            max_size = 10 * 1024 * 1024
+            max_size = _upload_limit(interaction.guild)
+            file_size = _upload_size(send_path, cached_size, max_size)
 
             if file_size > max_size:
                 size_mb = file_size / (1024 * 1024)
                 await interaction.edit_original_response(
                     content=(
                         f"❌ **{name}** is too large to upload\n"
-                        f"📁 File size: {size_mb:.1f}MB (limit: 10MB)\n"
+                        f"📁 File size: {size_mb:.1f}MB (limit: {max_size // (1024 * 1024)}MB)\n"
                         f"💡 Try a smaller version."
                     ),
                     view=None,
                 )
-                if cleanup:
-                    with contextlib.suppress(Exception):
-                        cleanup.unlink()
                 return
 
             try:
-                fname = send_path.name if send_path.suffix.lower() != ".svg" else f"{send_path.stem}.png"
-                discord_file = discord.File(send_path, filename=fname)
+                fname = orig_path.name if send_path is orig_path else f"{orig_path.stem}.png"
+                discord_file = await _read_upload(send_path, fname)
                 await interaction.edit_original_response(
                     content=f"🎨 **{name}**", attachments=[discord_file], view=None
                 )
@@ -315,10 +667,6 @@ class AssetView(discord.ui.View):
                     await interaction.edit_original_response(
                         content=f"❌ Upload failed: {str(e)}", view=None
                     )
-            finally:
-                if cleanup:
-                    with contextlib.suppress(Exception):
-                        cleanup.unlink()
 
         except Exception as e:
             try:
@@ -348,6 +696,10 @@ class AssetCommands:
         ".svg",
     }
 
+    # files this small upload well inside the 3s window for an initial interaction response
+    INSTANT_UPLOAD_MAX = 2 * 1024 * 1024
+    RECENT_QUERIES = 64  # ranked results kept for repeat searches
+
     def __init__(self, bot_client: discord.Client, command_tree: app_commands.CommandTree):
         self.client = bot_client
         self.tree = command_tree
@@ -361,57 +713,87 @@ class AssetCommands:
         self.maps_folder.mkdir(exist_ok=True)
 
         self._cache_ready = asyncio.Event()
-        asyncio.create_task(self._initialize_cache())
+        # directory walks are I/O-bound, so art and maps are scanned side by side; a
+        # dedicated pool keeps them from queueing behind other users of the default executor
+        self._scan_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="asset-scan")
+        self._init_task: Optional[asyncio.Task] = None
+        self._recent_queries: "OrderedDict[tuple, List[Tuple[str, Path, int]]]" = OrderedDict()
 
         self.register_commands()
 
+    async def start(self) -> None:
+        """Begin the initial cache scan. Call from setup_hook, once the event loop is running."""
+        if self._init_task is None:
+            self._init_task = asyncio.create_task(self._initialize_cache())
+
+    def close(self) -> None:
+        """Stop the scan threads and write out any unsaved cache changes. Call on bot shutdown."""
+        self._scan_pool.shutdown(wait=False, cancel_futures=True)
+        self.cache.flush()
+
+    async def _wait_for_cache(self, interaction: discord.Interaction) -> bool:
+        """Give a still-running startup scan a moment to finish; tell the user if it doesn't."""
+        if self._cache_ready.is_set():
+            return True
+        try:
+            await asyncio.wait_for(self._cache_ready.wait(), timeout=2)
+            return True
+        except asyncio.TimeoutError:
+            await interaction.followup.send("⏳ Still indexing assets, try again in a few seconds.")
+            return False
+
     async def _initialize_cache(self) -> None:
         try:
             print("🔄 Initializing asset cache...")
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self._build_cache_if_needed, self.art_folder)
-            await loop.run_in_executor(None, self._build_cache_if_needed, self.maps_folder)
+            await self._scan_folders()
             self._cache_ready.set()
             print("✅ Asset cache ready!")
         except Exception as e:
             print(f"❌ Cache initialization failed: {e}")
             self._cache_ready.set()
 
+    async def _scan_folders(self) -> None:
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            loop.run_in_executor(self._scan_pool, self._build_cache_if_needed, self.art_folder),
+            loop.run_in_executor(self._scan_pool, self._build_cache_if_needed, self.maps_folder),
+        )
+        await loop.run_in_executor(self._scan_pool, self.cache.flush)
+
     def _build_cache_if_needed(self, folder: Path) -> None:
         if self.cache.is_folder_cached(folder):
             return
 
         print(f"📁 Scanning {folder.name} folder...")
-        files: List[Tuple[str, str]] = []
+        files: List[Tuple[str, str, int]] = []
+        listing: List[str] = []  # every file, supported or not, for the folder hash
 
         if folder.exists():
-            for file_path in folder.rglob("*"):
-                if not file_path.is_file():
-                    continue
+            for parent_parts, name, st in _walk_files(str(folder)):
+                rel_path = os.path.join(*parent_parts, name)
+                listing.append(f"{rel_path}:{st.st_mtime}:{st.st_size}")
 
-                ext = file_path.suffix.lower()
+                stem, ext = os.path.splitext(name)
+                ext = ext.lower()
                 if ext not in self.SUPPORTED_EXTENSIONS:
                     continue
 
-                rel_obj = file_path.relative_to(folder)
-                rel_path = str(rel_obj)
-
-                parent_parts = list(rel_obj.parts[:-1])
-                base_name = file_path.stem.replace("_", " ").replace("-", " ").strip()
+                base_name = stem.translate(_UNDERSCORE_DASH).strip()
                 if ext == ".pdf":
                     base_name = f"{base_name} [PDF]"
                 display_name = base_name.title()
                 if parent_parts:
                     display_name = f"{'/'.join(parent_parts)} / {display_name}"
 
-                files.append((display_name, rel_path))
+                files.append((display_name, rel_path, st.st_size))
 
-        self.cache.cache_folder(folder, files)
+        folder_hash = _listing_digest(listing) if folder.exists() else "empty"
+        self.cache.cache_folder(folder, files, folder_hash)
         print(f"✅ Cached {len(files)} files from {folder.name}")
 
     # ---------- Improved search ----------
 
-    def _expand_with_synonyms(self, terms: List[str]) -> List[str]:
+    def _expand_with_synonyms(self, terms: Iterable[str]) -> List[str]:
         out: List[str] = []
         for t in terms:
             out.append(t)
@@ -430,39 +812,49 @@ class AssetCommands:
         query_include: List[str],
         query_phrases: List[str],
         excludes: List[str],
-        display_name: str,
-        rel_path: str,
+        searchable: str,
+        tokens: FrozenSet[str],
+        parent_parts: str,
+        min_score: float = 0.0,
     ) -> float:
-        dn_norm = _normalize_text(display_name)
-        rp_norm = _normalize_text(rel_path)
-        searchable = f"{dn_norm} {rp_norm}"
-        tokens = set(_tokenize(searchable))
-
-        for ex in excludes:
-            ex_norm = ex.lower()
-            if ex_norm in tokens or f" {ex_norm} " in f" {searchable} ":
-                return 0.0
+        """
+        Relevance of one file to the query. Returns 0.0 as soon as the file provably
+        can't reach min_score, so hopeless files never get to the edit-distance tier.
+        """
+        if excludes:
+            padded = f" {searchable} "
+            for ex in excludes:
+                # the token check covers plain words; the padded check catches excludes
+                # with punctuation (e.g. "red's") that tokenizing would have split
+                if ex in tokens or f" {ex} " in padded:
+                    return 0.0
 
         score = 0.0
 
         for ph in query_phrases:
-            ph_norm = _normalize_text(ph)
-            if ph_norm and ph_norm in searchable:
+            if ph and ph in searchable:
                 score += 1.5
 
+        # best case for what is left: 1.0 per remaining term, plus every parent bonus
+        parent_max = 0.15 * len(query_include) if parent_parts else 0.0
+        remaining = len(query_include)
         for term in query_include:
+            remaining -= 1
+            if score + (remaining + 1) + parent_max < min_score:
+                return 0.0
             term_norm = term.lower()
             term_score = 0.0
 
             if term_norm in tokens:
                 term_score = 1.0
             else:
-                if any(t.startswith(term_norm) for t in tokens):
+                prefix = _token_prefix_pattern(term_norm)
+                if prefix is not None and prefix.search(searchable):
                     term_score = 0.75
                 elif term_norm in searchable:
                     term_score = 0.5
-                else:
-                    closest = min((_levenshtein(term_norm, t, 3) for t in tokens), default=4)
+                elif score + 0.35 + remaining + parent_max >= min_score:
+                    closest = _closest_distance(term_norm, tokens)
                     if closest == 1:
                         term_score = 0.35
                     elif closest == 2:
@@ -474,7 +866,6 @@ class AssetCommands:
 
             score += term_score
 
-        parent_parts = _normalize_text("/".join(rel_path.split("/")[:-1]))
         if parent_parts:
             for term in query_include:
                 t = term.lower()
@@ -483,35 +874,139 @@ class AssetCommands:
 
         return score
 
+    def _score_rows(
+        self,
+        rows: List[Tuple[str, str, int, str, FrozenSet[str], str]],
+        folder: Path,
+        include: List[str],
+        phrases: List[str],
+        exclude: List[str],
+        min_score: float,
+    ) -> List[Tuple[float, str, Path, int]]:
+        results: List[Tuple[float, str, Path, int]] = []
+        for display_name, rel_path, size, searchable, tokens, parents in rows:
+            # no exists() here: the cache is validated per folder, and the send path
+            # reports a file that vanished since the last scan
+            s = self._match_score(include, phrases, exclude, searchable, tokens, parents, min_score)
+            if s >= min_score:
+                results.append((s, display_name, folder / rel_path, size))
+        return results
+
+    def _score_single_term(
+        self,
+        rows: List[Tuple[str, str, int, str, FrozenSet[str], str]],
+        folder: Path,
+        term: str,
+        min_score: float,
+    ) -> List[Tuple[float, str, Path, int]]:
+        """_match_score for a lone include term, over the files that contain it."""
+        prefix = _token_prefix_pattern(term)
+        results: List[Tuple[float, str, Path, int]] = []
+        for display_name, rel_path, size, searchable, tokens, parents in rows:
+            if term not in searchable:
+                continue  # every non-fuzzy tier implies a substring hit
+            if term in tokens:
+                s = 1.0
+            elif prefix is not None and prefix.search(searchable):
+                s = 0.75
+            else:
+                s = 0.5
+            if parents and term in parents:
+                s += 0.15
+            if s >= min_score:
+                results.append((s, display_name, folder / rel_path, size))
+        return results
+
     def _filter_and_rank(
         self,
         query: str,
         folder: Path,
         limit: int = 12,
         min_score: float = 0.30,
-    ) -> List[Tuple[str, Path]]:
+    ) -> List[Tuple[str, Path, int]]:
+        # Tables re-run the same few searches all session. Results are reused until the
+        # folder is re-cached; the parsed form makes "Dragon" and "dragon" share an entry.
         parsed = _parse_query(query)
-        phrases = list(parsed["phrases"])
-        include = list(parsed["include"])
-        exclude = list(parsed["exclude"])
-
-        include = self._expand_with_synonyms(include)
-
-        results: List[Tuple[float, str, Path]] = []
-        cached_files = self.cache.get_cached_files(folder)
-
-        for display_name, rel_path in cached_files:
-            full_path = folder / rel_path
-            if not full_path.exists():
-                continue
-
-            s = self._match_score(include, phrases, exclude, display_name, rel_path)
-            if s >= min_score:
-                results.append((s, display_name, full_path))
-
-        results.sort(key=lambda x: x[0], reverse=True)
-        top = results[: max(1, min(limit, 50))]
-        return [(name, path) for _, name, path in top]
+        key = (str(folder), self.cache.generation, parsed, limit, min_score)
+        cached = self._recent_queries.get(key)
+        if cached is not None:
+            self._recent_queries.move_to_end(key)
+            return list(cached)
+
+        matches = self._rank(parsed, folder, limit, min_score)
+        self._recent_queries[key] = matches
+        if len(self._recent_queries) > self.RECENT_QUERIES:
+            self._recent_queries.popitem(last=False)
+        return list(matches)
+
+    def _rank(
+        self,
+        parsed: ParsedQuery,
+        folder: Path,
+        limit: int,
+        min_score: float,
+    ) -> List[Tuple[str, Path, int]]:
+        # phrases are compared against normalized text; do that once, not per file
+        phrases = [_normalize_text(ph) for ph in parsed.phrases]
+        include = self._expand_with_synonyms(parsed.include)
+        exclude = list(parsed.exclude)
+
+        rows = self.cache.get_rows(folder)
+
+        # Files where an include term is a whole token, or could be a token prefix, are
+        # looked up in the inverted indexes. Any other file scores at most 0.65 per such term
+        # (substring + parent bonus; 0.9 for terms too short for the prefix index), so if
+        # enough candidates beat that, nothing else can reach the top results.
+        index = self.cache.get_token_index(folder)
+        prefix_index = self.cache.get_prefix_index(folder)
+        candidate_set: Set[int] = set()
+        ceiling = 1.5 * len(phrases)
+        for term in include:
+            candidate_set.update(index.get(term, ()))
+            if len(term) >= 3:
+                candidate_set.update(prefix_index.get(term[:3], ()))
+                ceiling += 0.65
+            else:
+                ceiling += 0.9
+        candidates = sorted(candidate_set)
+        if candidates:
+            results = self._score_rows(
+                [rows[i] for i in candidates], folder, include, phrases, exclude, min_score
+            )
+            if sum(1 for r in results if r[0] > ceiling) >= limit:
+                return _top_results(results, limit)
+
+        # A file where no include term or phrase occurs as a substring can only score
+        # through typo matches: at most 0.35 per include term, plus the parent bonuses.
+        # Once the substring hits fill the top results at or above that, the full
+        # edit-distance scan over every other file can't change them.
+        no_hit_ceiling = (0.35 + 0.15) * len(include)
+        wanted = max(1, min(limit, 50))
+
+        def settled(hits: List[Tuple[float, str, Path, int]]) -> bool:
+            if no_hit_ceiling < min_score:
+                return True
+            if len(hits) < wanted:
+                return False
+            return heapq.nlargest(wanted, (r[0] for r in hits))[-1] >= no_hit_ceiling
+
+        # Most queries are one short word. Score those inline without the general scorer.
+        if len(include) == 1 and not phrases and not exclude and len(include[0]) <= 8:
+            results = self._score_single_term(rows, folder, include[0], min_score)
+            if settled(results):
+                return _top_results(results, limit)
+
+        # Files containing some term or phrase are found with one regex pass each and
+        # scored in full, typo points for their other terms included.
+        gate = _any_term_pattern(tuple(include) + tuple(phrases))
+        if gate is not None:
+            hit_rows = [r for r in rows if gate.search(r[3])]
+            results = self._score_rows(hit_rows, folder, include, phrases, exclude, min_score)
+            if settled(results):
+                return _top_results(results, limit)
+
+        results = self._score_rows(rows, folder, include, phrases, exclude, min_score)
+        return _top_results(results, limit)
 
     # ---------- Commands ----------
 
@@ -554,20 +1049,36 @@ class AssetCommands:
         folder: Path,
         limit: Optional[int] = 12,
     ) -> None:
+        lim = 12 if limit is None else max(1, min(int(limit), 50))
+
+        # With a warm cache the search is a few ms; a single small hit can be sent as the
+        # initial response, saving the defer round-trip.
+        matches: Optional[List[Tuple[str, Path, int]]] = None
+        if self._cache_ready.is_set():
+            try:
+                if self.cache.is_folder_cached(folder):
+                    matches = self._filter_and_rank(query, folder, limit=lim, min_score=0.30)
+                    if len(matches) == 1 and await self._send_instant_asset(interaction, matches[0]):
+                        return
+            except Exception:
+                matches = None
+
         await interaction.response.defer(thinking=True)
+        if not await self._wait_for_cache(interaction):
+            return
 
         try:
-            lim = 12 if limit is None else max(1, min(int(limit), 50))
-
-            if not self.cache.is_folder_cached(folder):
-                await interaction.followup.send(
-                    "🔄 Cache is outdated, rebuilding... Try again in a moment."
-                )
-                loop = asyncio.get_event_loop()
-                await loop.run_in_executor(None, self._build_cache_if_needed, folder)
-                return
+            if matches is None:
+                if not self.cache.is_folder_cached(folder):
+                    await interaction.followup.send(
+                        "🔄 Cache is outdated, rebuilding... Try again in a moment."
+                    )
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(self._scan_pool, self._build_cache_if_needed, folder)
+                    await loop.run_in_executor(self._scan_pool, self.cache.flush)
+                    return
 
-            matches = self._filter_and_rank(query, folder, limit=lim, min_score=0.30)
+                matches = self._filter_and_rank(query, folder, limit=lim, min_score=0.30)
 
             if not matches:
                 await interaction.followup.send(
@@ -587,6 +1098,22 @@ class AssetCommands:
         except Exception as e:
             await interaction.followup.send(f"❌ Error searching for {asset_type}: {str(e)}")
 
+    async def _send_instant_asset(
+        self,
+        interaction: discord.Interaction,
+        item: Tuple[str, Path, int],
+    ) -> bool:
+        """Send a small non-SVG asset as the initial response. False means defer and use the normal path."""
+        name, path, size = item
+        if path.suffix.lower() == ".svg" or not 0 <= size <= self.INSTANT_UPLOAD_MAX:
+            return False
+        try:
+            discord_file = await _read_upload(path, path.name)
+            await interaction.response.send_message(f"🎨 **{name}**", file=discord_file)
+        except (OSError, discord.HTTPException):
+            return False
+        return True
+
     async def _random_asset(
         self,
         interaction: discord.Interaction,
@@ -595,13 +1122,16 @@ class AssetCommands:
         folder: Path,
     ) -> None:
         await interaction.response.defer(thinking=True)
+        if not await self._wait_for_cache(interaction):
+            return
         try:
             if not self.cache.is_folder_cached(folder):
                 await interaction.followup.send(
                     "🔄 Cache is outdated, rebuilding... Try again in a moment."
                 )
-                loop = asyncio.get_event_loop()
-                await loop.run_in_executor(None, self._build_cache_if_needed, folder)
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self._scan_pool, self._build_cache_if_needed, folder)
+                await loop.run_in_executor(self._scan_pool, self.cache.flush)
                 return
 
             filtered = self._filter_and_rank(query, folder, limit=50, min_score=0.62)
@@ -621,39 +1151,35 @@ class AssetCommands:
     async def _send_single_asset(
         self,
         interaction: discord.Interaction,
-        item: Tuple[str, Path],
+        item: Tuple[str, Path, int],
         asset_type: str,
     ) -> None:
-        name, orig_path = item
+        name, orig_path, cached_size = item
         if not orig_path.exists():
             await interaction.followup.send(f"❌ File not found: **{name}**")
             return
 
         send_path = orig_path
-        cleanup: Optional[Path] = None
         if orig_path.suffix.lower() == ".svg":
-            png = _rasterize_svg(orig_path)
-            if png and png.exists():
+            png = await _rasterize_svg(orig_path)
+            if png:
                 send_path = png
-                cleanup = png
+                cached_size = -1
 
-        file_size = send_path.stat().st_size
-        max_size = 10 * 1024 * 1024
+        max_size = _upload_limit(interaction.guild)
+        file_size = _upload_size(send_path, cached_size, max_size)
 
         if file_size > max_size:
             size_mb = file_size / (1024 * 1024)
             await interaction.followup.send(
                 f"❌ **{name}** is too large to upload\n"
-                f"📁 File size: {size_mb:.1f}MB (limit: 10MB)"
+                f"📁 File size: {size_mb:.1f}MB (limit: {max_size // (1024 * 1024)}MB)"
             )
-            if cleanup:
-                with contextlib.suppress(Exception):
-                    cleanup.unlink()
             return
 
         try:
-            fname = send_path.name if send_path.suffix.lower() != ".svg" else f"{send_path.stem}.png"
-            discord_file = discord.File(send_path, filename=fname)
+            fname = orig_path.name if send_path is orig_path else f"{orig_path.stem}.png"
+            discord_file = await _read_upload(send_path, fname)
             await interaction.followup.send(f"🎨 **{name}**", file=discord_file)
         except discord.HTTPException as e:
             if "413" in str(e) or "too large" in str(e).lower():
@@ -665,19 +1191,13 @@ class AssetCommands:
                 )
             else:
                 await interaction.followup.send(f"❌ Upload failed: {str(e)}")
-        finally:
-            if cleanup:
-                with contextlib.suppress(Exception):
-                    cleanup.unlink()
 
     async def _refresh_cache(self, interaction: discord.Interaction) -> None:
         await interaction.response.defer(ephemeral=True)
         try:
-            self.cache.cache_data = {"version": "1.0", "folders": {}}
+            self.cache.clear()
 
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self._build_cache_if_needed, self.art_folder)
-            await loop.run_in_executor(None, self._build_cache_if_needed, self.maps_folder)
+            await self._scan_folders()
 
             stats = self.get_stats()
             await interaction.followup.send(
@@ -697,8 +1217,10 @@ class AssetCommands:
         }
 
 
-def setup_asset_commands(client: discord.Client, tree: app_commands.CommandTree) -> AssetCommands:
-    return AssetCommands(client, tree)
+async def setup_asset_commands(client: discord.Client, tree: app_commands.CommandTree) -> AssetCommands:
+    asset_commands = AssetCommands(client, tree)
+    await asset_commands.start()
+    return asset_commands
 
 
 def add_stats_command(tree: app_commands.CommandTree, asset_commands: AssetCommands) -> None:
@@ -0,0 +1,306 @@
+# whisper_worker.py
+"""
+Whisper Transcription Worker for FreshBot
+Runs faster-whisper in its own process so decoding never competes with the Discord
+event loop for the GIL (heartbeats, REST and voice receive stay responsive).
+- Started by app.py via WhisperProcess; one request at a time
+- Control messages are JSON lines over stdin/stdout
+- Audio arrives as float32 16 kHz mono in a shared-memory segment named by each request
+- Silero VAD (bundled with faster-whisper) trims/gates clips before decoding
+- Several clips are decoded as one batch with BatchedInferencePipeline
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+SR = 16000
+MIN_VOICED_SECONDS = 0.3
+
+# decode options shared by the single-clip and batched paths
+DECODE_OPTIONS = dict(
+    beam_size=1,
+    best_of=1,
+    temperature=0.0,  # no fallback re-decodes
+    condition_on_previous_text=False,
+    word_timestamps=False,
+    without_timestamps=True,  # only the text is used; skip timestamp tokens
+)
+
+
+# ---------- worker side (runs in the child process) ----------
+
+def _speech_only(audio_f32: np.ndarray, vad_options) -> np.ndarray:
+    # Silero VAD over the clip; returns just the voiced spans, or an empty array when
+    # there is too little speech to be worth a decode
+    from faster_whisper.vad import get_speech_timestamps
+
+    spans = get_speech_timestamps(audio_f32, vad_options, sampling_rate=SR)
+    voiced = sum(s["end"] - s["start"] for s in spans)
+    if voiced < MIN_VOICED_SECONDS * SR:
+        return audio_f32[:0]
+    if len(spans) == 1:
+        return audio_f32[spans[0]["start"]:spans[0]["end"]]
+    return np.concatenate([audio_f32[s["start"]:s["end"]] for s in spans])
+
+
+def _do_transcribe(model, audio_f32: np.ndarray, lang: str, prompt: str = "") -> str:
+    segments, _ = model.transcribe(
+        audio_f32,
+        language=lang,
+        initial_prompt=prompt or None,
+        vad_filter=False,  # callers pass speech already trimmed by _speech_only
+        **DECODE_OPTIONS,
+    )
+    out: List[str] = []
+    for seg in segments:
+        t = (seg.text or "").strip()
+        if t:
+            out.append(t)
+    return " ".join(out).strip()
+
+
+def _do_transcribe_batch(pipeline, audios: List[np.ndarray], lang: str) -> List[str]:
+    # Lay the clips out in equal, whole-second, zero-padded slots of one buffer. With one
+    # clip_timestamps entry per slot and chunk_length equal to the slot, every clip becomes
+    # its own batch row, so the encoder runs once over the padded batch.
+    slot_seconds = max(1, -(-max(a.shape[0] for a in audios) // SR))
+    slot = slot_seconds * SR
+    joined = np.zeros(slot * len(audios), dtype=np.float32)
+    clips: List[Dict[str, float]] = []
+    for i, a in enumerate(audios):
+        joined[i * slot:i * slot + a.shape[0]] = a
+        clips.append({"start": i * slot_seconds, "end": (i + 1) * slot_seconds})
+    segments, _ = pipeline.transcribe(
+        joined,
+        language=lang,
+        clip_timestamps=clips,
+        chunk_length=slot_seconds,
+        batch_size=len(audios),
+        **DECODE_OPTIONS,  # segment times come from clip_timestamps, not timestamp tokens
+    )
+    out: List[List[str]] = [[] for _ in audios]
+    for seg in segments:
+        if seg.no_speech_prob > 0.6 and seg.avg_logprob < -1.0:
+            continue
+        t = (seg.text or "").strip()
+        if t:
+            i = min(len(audios) - 1, int((seg.start + seg.end) / 2 // slot_seconds))
+            out[i].append(t)
+    return [" ".join(parts).strip() for parts in out]
+
+
+def transcribe_clips(model, pipeline, vad_options, audios: List[np.ndarray], lang: str, prompts: Optional[List[str]] = None) -> List[str]:
+    # vad_options is None when WHISPER_VAD=0: the bot's capture-time gates are trusted
+    speech = [_speech_only(a, vad_options) for a in audios] if vad_options is not None else audios
+    voiced = [i for i, a in enumerate(speech) if a.size]
+    texts = [""] * len(audios)
+    if len(voiced) == 1:
+        # the batched pipeline takes one prompt for the whole batch, so per-speaker
+        # context is only applied when a clip is decoded on its own
+        prompt = prompts[voiced[0]] if prompts else ""
+        texts[voiced[0]] = _do_transcribe(model, speech[voiced[0]], lang, prompt)
+    elif voiced:
+        for i, text in zip(voiced, _do_transcribe_batch(pipeline, [speech[i] for i in voiced], lang)):
+            texts[i] = text
+    return texts
+
+
+def _cpu_compute_type() -> str:
+    # int8 only pays off with a fast int8 dot product (AVX-512 VNNI, AVX2, or the Arm dot
+    # product extension); on older CPUs the quantize/dequantize overhead makes it slower
+    # than float32. numpy's runtime feature table works the same on Windows and Linux.
+    try:
+        from numpy._core._multiarray_umath import __cpu_features__ as features
+    except ImportError:
+        from numpy.core._multiarray_umath import __cpu_features__ as features
+    if any(features.get(flag) for flag in ("AVX512VNNI", "AVX2", "ASIMDDP")):
+        return "int8"
+    return "float32"
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":
+        # the parent owns the segment; keep this process's resource tracker from unlinking it
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+    return shm
+
+
+def _pin_to_cpus(spec: str) -> List[int]:
+    # "0-3,6" -> [0, 1, 2, 3, 6]; pins this process when the OS supports it
+    cpus: List[int] = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        lo, _, hi = part.partition("-")
+        cpus.extend(range(int(lo), int(hi or lo) + 1))
+    if not cpus:
+        return []
+    if not hasattr(os, "sched_setaffinity"):
+        print("WHISPER_CPU_AFFINITY is not supported on this OS; ignoring", file=sys.stderr)
+        return []
+    os.sched_setaffinity(0, cpus)
+    return cpus
+
+
+def main() -> None:
+    cpus = _pin_to_cpus(os.getenv("WHISPER_CPU_AFFINITY", ""))
+    cpu_threads = int(os.getenv("WHISPER_CPU_THREADS", "0") or 0) or len(cpus) or (os.cpu_count() or 0)
+    # OpenMP reads this once, when CTranslate2 loads
+    os.environ.setdefault("OMP_NUM_THREADS", str(cpu_threads))
+
+    import ctranslate2
+    from faster_whisper import BatchedInferencePipeline, WhisperModel
+    from faster_whisper.vad import VadOptions, get_vad_model
+
+    # the protocol owns stdout; anything the libraries print goes to stderr
+    proto = sys.stdout
+    sys.stdout = sys.stderr
+
+    model_size = os.getenv("WHISPER_MODEL", "small").strip() or "small"
+    device = os.getenv("WHISPER_DEVICE", "").strip() or ("cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu")
+    # int8 weights on CPU (VNNI int8 GEMM), int8 weights with fp16 activations on GPU
+    compute = os.getenv("WHISPER_COMPUTE", "").strip() or ("int8_float16" if device == "cuda" else _cpu_compute_type())
+    device_index = int(os.getenv("WHISPER_DEVICE_INDEX", "0") or 0)
+    print(f"Loading Whisper model: {model_size} ({device}:{device_index}, {compute})", file=sys.stderr)
+    model = WhisperModel(
+        model_size,
+        device=device,
+        device_index=device_index,
+        compute_type=compute,
+        cpu_threads=cpu_threads,
+        # one request is decoded at a time, so extra model replicas would only cost memory
+        num_workers=int(os.getenv("WHISPER_NUM_WORKERS", "1") or 1),
+    )
+    pipeline = BatchedInferencePipeline(model=model)
+    use_vad = os.getenv("WHISPER_VAD", "1").strip().lower() not in ("0", "false", "no", "off")
+    vad_options = VadOptions(min_silence_duration_ms=500, speech_pad_ms=100) if use_vad else None
+
+    # pay the one-time costs (Silero ONNX session, CTranslate2 lazy init, first-call
+    # allocations) before reporting ready, not on the first real utterance
+    if use_vad:
+        get_vad_model()
+    _do_transcribe(model, np.zeros(SR, dtype=np.float32), os.getenv("LANGUAGE", "en").strip() or "en")
+
+    proto.write(json.dumps({"ready": True}) + "\n")
+    proto.flush()
+
+    shm: Optional[shared_memory.SharedMemory] = None
+    for line in sys.stdin:
+        req = json.loads(line)
+        # views into shm.buf must be gone before the segment can be closed, including
+        # when a request fails, or every later request would fail on BufferError
+        audio = clips = None
+        try:
+            if shm is None or shm.name != req["shm"]:
+                old, shm = shm, None
+                if old is not None:
+                    old.close()
+                shm = _attach(req["shm"])
+            audio = np.ndarray((req["total"],), dtype=np.float32, buffer=shm.buf)
+            clips = [audio[start:end] for start, end in req["bounds"]]
+            reply = {"id": req["id"], "texts": transcribe_clips(model, pipeline, vad_options, clips, req["lang"], req.get("prompts"))}
+        except Exception as e:
+            reply = {"id": req.get("id"), "error": repr(e)}
+        finally:
+            audio = clips = None
+        proto.write(json.dumps(reply) + "\n")
+        proto.flush()
+
+    if shm is not None:
+        shm.close()
+
+
+# ---------- bot side (runs in the app.py process) ----------
+
+class WhisperProcess:
+    """
+    Owns the worker process and one reusable shared-memory segment.
+    transcribe_clips() is blocking and serialized (the child decodes one request at a
+    time), so call it from an executor thread; the pipe read releases the GIL.
+    """
+
+    def __init__(self, initial_samples: int = SR * 48) -> None:
+        self._lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._initial_samples = initial_samples
+        self._next_id = 0
+
+    def start(self) -> None:
+        with self._lock:
+            self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            return
+        self._proc = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve())],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+        )
+        ready = self._proc.stdout.readline()  # type: ignore[union-attr]
+        if not ready:
+            raise RuntimeError("Whisper worker exited during startup")
+
+    def _ensure_capacity(self, samples: int) -> shared_memory.SharedMemory:
+        nbytes = max(samples, self._initial_samples) * 4
+        if self._shm is None or self._shm.size < nbytes:
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+            self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        return self._shm
+
+    def transcribe_clips(self, audios: List[np.ndarray], lang: str, prompts: Optional[List[str]] = None) -> List[str]:
+        total = sum(a.shape[0] for a in audios)
+        with self._lock:
+            self._ensure_started()
+            shm = self._ensure_capacity(total)
+            buf = np.ndarray((total,), dtype=np.float32, buffer=shm.buf)
+            bounds: List[Tuple[int, int]] = []
+            offset = 0
+            for a in audios:
+                buf[offset:offset + a.shape[0]] = a
+                bounds.append((offset, offset + a.shape[0]))
+                offset += a.shape[0]
+            del buf
+            self._next_id += 1
+            req = {"id": self._next_id, "shm": shm.name, "total": total, "bounds": bounds, "lang": lang, "prompts": prompts}
+            proc = self._proc
+            proc.stdin.write(json.dumps(req) + "\n")  # type: ignore[union-attr]
+            proc.stdin.flush()  # type: ignore[union-attr]
+            line = proc.stdout.readline()  # type: ignore[union-attr]
+        if not line:
+            raise RuntimeError("Whisper worker exited")
+        reply = json.loads(line)
+        if "error" in reply:
+            raise RuntimeError(f"Whisper worker error: {reply['error']}")
+        return reply["texts"]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._proc is not None:
+                try:
+                    self._proc.stdin.close()  # type: ignore[union-attr]
+                    self._proc.wait(timeout=5)
+                except Exception:
+                    self._proc.kill()
+                self._proc = None
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+                self._shm = None
+
+
+if __name__ == "__main__":
+    main()